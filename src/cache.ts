@@ -0,0 +1,171 @@
+/**
+ * In-Process Response Cache
+ *
+ * Caches deterministic (temperature = 0) LLM responses so repeated
+ * identical calls skip the network entirely. Keys are built from
+ * (model, system prompt, user prompt) and hashed with FNV-1a: cache keys
+ * are not adversarial, so a cryptographic digest (SHA-256) would only add
+ * CPU cost on every lookup and store.
+ */
+
+import { config } from "./config.js";
+
+export interface CacheEntry {
+  text: string;
+  tokens: number;
+  /** Monotonic insertion time (performance.now(), milliseconds). */
+  timestamp: number;
+}
+
+/**
+ * 64-bit FNV-1a digest of a string, returned as a 16-char hex key.
+ *
+ * Implemented as two independent 32-bit FNV-1a lanes to avoid BigInt
+ * overhead in the per-character loop.
+ */
+export function fnv1a64(content: string): string {
+  let h1 = 0x811c9dc5;
+  let h2 = 0xcbf29ce4;
+  for (let i = 0; i < content.length; i++) {
+    const c = content.charCodeAt(i);
+    h1 = Math.imul(h1 ^ c, 0x01000193);
+    h2 = Math.imul(h2 ^ c, 0x01000193);
+  }
+  return (
+    (h1 >>> 0).toString(16).padStart(8, "0") +
+    (h2 >>> 0).toString(16).padStart(8, "0")
+  );
+}
+
+export interface CacheValue {
+  text: string;
+  tokens: number;
+}
+
+export interface CacheStats {
+  hits: number;
+  misses: number;
+  evictions: number;
+  size: number;
+}
+
+function normalizeWhitespace(s: string): string {
+  return s.split(/\s+/).filter(Boolean).join(" ");
+}
+
+export class ResponseCache {
+  private cache: Map<string, CacheEntry> = new Map();
+  private inflight: Map<string, Promise<CacheValue>> = new Map();
+  private hits = 0;
+  private misses = 0;
+  private evictions = 0;
+
+  constructor(
+    private maxSize: number = 256,
+    private ttlSeconds: number = 3600
+  ) {}
+
+  makeKey(model: string, systemPrompt: string, prompt: string, temperature: number = 0): string {
+    // Optional: collapse whitespace so trailing newlines or doubled
+    // spaces (common from MCP clients) share one cache entry. Trade-off:
+    // prompts whose whitespace is semantically meaningful would collide,
+    // hence the MAKER_CACHE_NORMALIZE gate.
+    if (config.cacheNormalize) {
+      systemPrompt = normalizeWhitespace(systemPrompt);
+      prompt = normalizeWhitespace(prompt);
+    }
+    // Temperature is part of the key so calls sampled at different
+    // temperatures never share an entry.
+    return fnv1a64(`${model}\0${temperature}\0${systemPrompt}\0${prompt}`);
+  }
+
+  get(key: string): CacheEntry | undefined {
+    const entry = this.cache.get(key);
+    if (!entry) {
+      this.misses++;
+      return undefined;
+    }
+    // Lazy TTL: expired entries are only evicted when touched.
+    // Monotonic clock — TTLs must not jump on NTP/wall-clock steps.
+    if (performance.now() - entry.timestamp > this.ttlSeconds * 1000) {
+      this.cache.delete(key);
+      this.misses++;
+      return undefined;
+    }
+    // True LRU: re-inserting moves the entry to the most-recent position
+    // (Map preserves insertion order), so hot entries survive eviction.
+    this.cache.delete(key);
+    this.cache.set(key, entry);
+    this.hits++;
+    return entry;
+  }
+
+  set(key: string, text: string, tokens: number): void {
+    // Delete-then-set so an overwritten key also moves to most-recent.
+    this.cache.delete(key);
+    while (this.cache.size >= this.maxSize) {
+      // The first key is the least recently used entry — O(1) eviction.
+      const lru = this.cache.keys().next().value;
+      if (lru === undefined) {
+        break;
+      }
+      this.cache.delete(lru);
+      this.evictions++;
+    }
+    this.cache.set(key, { text, tokens, timestamp: performance.now() });
+  }
+
+  /**
+   * Single-flight lookup: if the key is cached, return it; if an
+   * identical request is already in flight, await that one instead of
+   * issuing a duplicate; otherwise run `compute`, store the result, and
+   * share it with any callers that arrived in the meantime.
+   */
+  async getOrCompute(
+    key: string,
+    compute: () => Promise<CacheValue>
+  ): Promise<CacheValue> {
+    const cached = this.get(key);
+    if (cached) {
+      return { text: cached.text, tokens: cached.tokens };
+    }
+
+    const pending = this.inflight.get(key);
+    if (pending) {
+      return pending;
+    }
+
+    const promise = (async () => {
+      try {
+        const value = await compute();
+        this.set(key, value.text, value.tokens);
+        return value;
+      } finally {
+        this.inflight.delete(key);
+      }
+    })();
+
+    this.inflight.set(key, promise);
+    return promise;
+  }
+
+  get size(): number {
+    return this.cache.size;
+  }
+
+  /** Lifetime hit/miss/eviction counters for monitoring. */
+  stats(): CacheStats {
+    return {
+      hits: this.hits,
+      misses: this.misses,
+      evictions: this.evictions,
+      size: this.cache.size,
+    };
+  }
+}
+
+// Single shared instance used by the LLM call path.
+export const responseCache = new ResponseCache(
+  config.cacheMaxSize,
+  config.cacheTtlSeconds
+);
@@ -39,11 +39,55 @@ export interface Config {
   /** Maximum number of tokens for LLM-generated responses. */
   maxTokens: number;
 
+  /**
+   * Token cap for voter samples specifically. Defaults to maxTokens;
+   * lowering it (e.g. 256 for short-answer workloads) cuts per-sample
+   * generation time and cost, and also lowers the red-flag threshold
+   * so overlong voter answers are discarded sooner.
+   */
+  voterMaxTokens: number;
+
   /** Maximum number of voting rounds before forcing a decision. */
   maxRounds: number;
 
   /** Maximum recursion depth for nested agent calls (loop prevention) */
   maxRecursionDepth: number;
+
+  /** Maximum number of entries kept in the in-process response cache. */
+  cacheMaxSize: number;
+
+  /** Time-to-live (in seconds) for response cache entries. */
+  cacheTtlSeconds: number;
+
+  /** Size voting batches to the remaining k-margin instead of a fixed batch. */
+  adaptiveBatch: boolean;
+
+  /** Stream voter responses and abort generations that cross the red-flag token cap. */
+  streamVoting: boolean;
+
+  /** Start the judge once ~70% of council voters have answered instead of waiting for the slowest. */
+  quorumJudge: boolean;
+
+  /** Collapse whitespace in prompts before hashing response-cache keys. */
+  cacheNormalize: boolean;
+
+  /**
+   * Send a prompt_cache_key derived from the system prompt so
+   * server-side prefix caching routes all voters sharing a system
+   * prompt to the same cache. Off by default: not every
+   * OpenAI-compatible backend tolerates the extra field.
+   */
+  promptCacheKey: boolean;
+
+  /**
+   * Highest sampling temperature the response cache will serve.
+   * 0 (default) caches only deterministic calls; raising it (e.g. 0.2)
+   * also caches single-shot judge/decomposer/review calls for repeat
+   * traffic, trading response variety for saved roundtrips. Voter
+   * samples are never cached above temperature 0 — collapsing parallel
+   * samples onto one generation would defeat the voting algorithm.
+   */
+  cacheMaxTemperature: number;
 }
 
 /**
@@ -61,6 +105,36 @@ function getNumericEnv(envVar: string, defaultValue: number): number {
   return isNaN(parsed) ? defaultValue : parsed;
 }
 
+/**
+ * Helper function to read and convert a floating-point environment variable.
+ * @param envVar - The environment variable name.
+ * @param defaultValue - The default value to use if the variable is not defined or invalid.
+ * @returns The numeric value of the variable or the default.
+ */
+function getFloatEnv(envVar: string, defaultValue: number): number {
+  const value = process.env[envVar];
+  if (value === undefined || value === null) {
+    return defaultValue;
+  }
+  const parsed = parseFloat(value);
+  return isNaN(parsed) ? defaultValue : parsed;
+}
+
+/**
+ * Helper function to read a boolean environment variable.
+ * Accepts "true"/"1" (case-insensitive) as true; anything else is false.
+ * @param envVar - The environment variable name.
+ * @param defaultValue - The default value to use if the variable is not defined.
+ * @returns The boolean value of the variable or the default.
+ */
+function getBooleanEnv(envVar: string, defaultValue: boolean): boolean {
+  const value = process.env[envVar];
+  if (value === undefined || value === null) {
+    return defaultValue;
+  }
+  return value.toLowerCase() === 'true' || value === '1';
+}
+
 /**
  * Function to read, validate, and build the configuration object.
  * @returns An immutable configuration object.
@@ -81,6 +155,8 @@ function createConfig(): Config {
   // Using gpt-4o-mini as default since it's widely supported by OpenAI-compatible APIs
   const defaultModel = process.env.MAKER_API_MODEL || 'gpt-4o-mini';
 
+  const maxTokens = getNumericEnv("MAKER_MAX_TOKENS", 16000);
+
   const appConfig: Config = {
     apiKey: process.env.MAKER_API_KEY || "",
     apiUrl: apiUrl,
@@ -91,9 +167,18 @@ function createConfig(): Config {
     // Falls back to gpt-4o-mini which is widely supported
     voterModel: process.env.MAKER_VOTER_MODEL || defaultModel,
     k: getNumericEnv("MAKER_K", 3),
-    maxTokens: getNumericEnv("MAKER_MAX_TOKENS", 16000),
+    maxTokens,
+    voterMaxTokens: getNumericEnv("MAKER_VOTER_MAX_TOKENS", maxTokens),
     maxRounds: getNumericEnv("MAKER_MAX_ROUNDS", 10),
     maxRecursionDepth: getNumericEnv("MAKER_MAX_RECURSION_DEPTH", 5),
+    cacheMaxSize: getNumericEnv("MAKER_CACHE_MAX_SIZE", 256),
+    cacheTtlSeconds: getNumericEnv("MAKER_CACHE_TTL", 3600),
+    adaptiveBatch: getBooleanEnv("MAKER_ADAPTIVE_BATCH", false),
+    streamVoting: getBooleanEnv("MAKER_STREAM_VOTING", true),
+    quorumJudge: getBooleanEnv("MAKER_QUORUM_JUDGE", false),
+    cacheNormalize: getBooleanEnv("MAKER_CACHE_NORMALIZE", false),
+    promptCacheKey: getBooleanEnv("MAKER_PROMPT_CACHE_KEY", false),
+    cacheMaxTemperature: getFloatEnv("MAKER_CACHE_MAX_TEMPERATURE", 0),
   };
 
   // Critical validation: the API key is required.
@@ -0,0 +1,115 @@
+/**
+ * Shared HTTP Transport
+ *
+ * Every LLM call (voters, judge, orchestrator) targets the same API host,
+ * so all of them share one keep-alive tuned connection pool. Keeping
+ * connections warm across voter batches avoids paying a TCP + TLS
+ * handshake (~50-200 ms) per call — a large share of the latency of
+ * short prompts.
+ *
+ * The server is deliberately single-process: one stdio MCP transport,
+ * with all concurrency in-process on the event loop. Keep it that way —
+ * splitting the council across OS worker processes would fragment this
+ * pool (and the response cache) into per-process copies, paying the cold
+ * TLS handshake and cache warm-up once per worker instead of once per
+ * server. If the deployment ever needs more than one process, put the
+ * LLM calls behind a single shared gateway process rather than giving
+ * each worker its own pool.
+ */
+
+import { Agent, setGlobalDispatcher } from "undici";
+
+/** Per-origin connection cap; sized to cover batch x voter fan-out. */
+export const HTTP_MAX_CONNECTIONS = 128;
+
+export const httpAgent = new Agent({
+  connections: HTTP_MAX_CONNECTIONS,
+  // Keep idle sockets for 60 s to match typical server keep-alive
+  // defaults (the undici default of 4 s drops them between batches).
+  keepAliveTimeout: 60_000,
+  keepAliveMaxTimeout: 60_000,
+  // HTTP/2 multiplexes the voter fan-out over fewer sockets; ALPN
+  // negotiation falls back to HTTP/1.1 for servers without h2 support.
+  // MAKER_HTTP2=false opts out entirely.
+  allowH2: process.env.MAKER_HTTP2 !== 'false',
+  // Fail fast on unreachable hosts instead of the OS-level default,
+  // and don't let a stalled response body hold a pool slot forever.
+  connect: { timeout: 10_000 },
+  bodyTimeout: 120_000,
+});
+
+// Route the global fetch (used by createMessage and the OpenAI SDK)
+// through the shared agent.
+setGlobalDispatcher(httpAgent);
+
+// Tear the pool down on exit so pending sockets don't hold the process.
+process.on("exit", () => {
+  httpAgent.destroy();
+});
+
+/**
+ * Maximum number of LLM requests allowed in flight at once.
+ *
+ * Derived from the pool's connection cap so the two limits stay in
+ * lock-step: a semaphore larger than the pool just moves queueing into
+ * the socket layer, and a smaller one wastes pool capacity.
+ */
+function getMaxConcurrentRequests(): number {
+  const raw = process.env.MAKER_MAX_CONCURRENT;
+  if (raw === undefined) {
+    return HTTP_MAX_CONNECTIONS;
+  }
+  const parsed = parseInt(raw, 10);
+  if (isNaN(parsed) || parsed <= 0) {
+    return HTTP_MAX_CONNECTIONS;
+  }
+  if (parsed > HTTP_MAX_CONNECTIONS) {
+    console.error(
+      `[HTTP] MAKER_MAX_CONCURRENT (${parsed}) exceeds the connection pool ` +
+      `limit (${HTTP_MAX_CONNECTIONS}); excess requests will queue on sockets.`
+    );
+  }
+  return parsed;
+}
+
+export const MAX_CONCURRENT_REQUESTS = getMaxConcurrentRequests();
+
+/** Minimal counting semaphore for bounding concurrent async work. */
+export class Semaphore {
+  private queue: Array<() => void> = [];
+  private available: number;
+
+  constructor(permits: number) {
+    this.available = permits;
+  }
+
+  async acquire(): Promise<void> {
+    if (this.available > 0) {
+      this.available--;
+      return;
+    }
+    const queuedAt = performance.now();
+    await new Promise<void>((resolve) => this.queue.push(resolve));
+    const waitedMs = performance.now() - queuedAt;
+    // Surface long queue waits so saturation is distinguishable from
+    // slow network when diagnosing throughput.
+    if (waitedMs > 1000) {
+      console.error(
+        `[HTTP] Request waited ${Math.round(waitedMs)}ms for a concurrency slot ` +
+        `(limit ${MAX_CONCURRENT_REQUESTS}); consider raising MAKER_MAX_CONCURRENT.`
+      );
+    }
+  }
+
+  release(): void {
+    const next = this.queue.shift();
+    if (next) {
+      next();
+    } else {
+      this.available++;
+    }
+  }
+}
+
+/** Shared gate that every outbound LLM request must acquire. */
+export const llmSemaphore = new Semaphore(MAX_CONCURRENT_REQUESTS);
@@ -233,7 +233,7 @@ async function main() {
     const { name, arguments: args } = request.params;
 
     try {
-      let result: string;
+      let response: object;
 
       switch (name) {
         case "query": {
@@ -243,9 +243,7 @@ async function main() {
             intent: args?.intent as Intent | undefined,
             config: args?.config as QueryConfig | undefined,
           };
-          const response = await handleQuery(queryRequest);
-          // Return as formatted JSON for the unified API
-          result = JSON.stringify(response, null, 2);
+          response = await handleQuery(queryRequest);
           break;
         }
 
@@ -258,8 +256,7 @@ async function main() {
               k: args?.k as number | undefined,
             },
           };
-          const response = await handleQuery(queryRequest);
-          result = JSON.stringify(response, null, 2);
+          response = await handleQuery(queryRequest);
           break;
         }
 
@@ -271,8 +268,7 @@ async function main() {
               k: args?.k as number | undefined,
             },
           };
-          const response = await handleQuery(queryRequest);
-          result = JSON.stringify(response, null, 2);
+          response = await handleQuery(queryRequest);
           break;
         }
 
@@ -281,8 +277,7 @@ async function main() {
             prompt: args?.task as string,
             intent: 'decomposition',
           };
-          const response = await handleQuery(queryRequest);
-          result = JSON.stringify(response, null, 2);
+          response = await handleQuery(queryRequest);
           break;
         }
 
@@ -293,22 +288,18 @@ async function main() {
             args?.context as string | undefined,
             args?.focus_areas as string[] | undefined
           );
-          result = JSON.stringify(
-            {
-              result: review,
-              metadata: {
-                tool_used: 'senior_code_review',
-                request_id: 'n/a',
-                timestamp: new Date().toISOString(),
-                performance: {
-                  total_time_seconds: 0,
-                },
-                raw_output: review,
+          response = {
+            result: review,
+            metadata: {
+              tool_used: 'senior_code_review',
+              request_id: 'n/a',
+              timestamp: new Date().toISOString(),
+              performance: {
+                total_time_seconds: 0,
               },
+              raw_output: review,
             },
-            null,
-            2
-          );
+          };
           break;
         }
 
@@ -316,8 +307,9 @@ async function main() {
           throw new Error(`Unknown tool: ${name}`);
       }
 
+      // Single serialization point: every tool returns formatted JSON
       return {
-        content: [{ type: "text", text: result }],
+        content: [{ type: "text", text: JSON.stringify(response, null, 2) }],
       };
     } catch (error) {
       const errorMessage = error instanceof Error ? error.message : String(error);
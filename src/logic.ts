@@ -9,6 +9,8 @@ import { config } from "./config.js";
 export type { Config as MakerConfig } from "./config.js";
 import { internalTools } from './internal-tools.js';
 import { logger } from './db/logger.js';
+import { responseCache, fnv1a64 } from './cache.js';
+import { llmSemaphore } from './http.js'; // also installs the shared keep-alive dispatcher
 
 // ============================================================================
 // TYPES AND INTERFACES
@@ -17,11 +19,13 @@ import { logger } from './db/logger.js';
 // The MakerConfig interface is now imported and re-exported from config.ts
 
 export interface VotingState {
-  votes: Map<string, number>;
+  votes: VoteTracker;
   totalSamples: number;
   validSamples: number;
   redFlagged: number;
   elapsedTime: number;
+  earlyTerminated: boolean;
+  earlyTerminationReason?: string;
 }
 
 export interface RedFlagResult {
@@ -77,26 +81,160 @@ let openaiClient: OpenAI | null = null;
 
 export function getClient(): OpenAI {
   if (!openaiClient) {
+    // Pass the global fetch explicitly: the SDK's default Node transport
+    // (node-fetch + agentkeepalive) ignores undici's global dispatcher,
+    // so without this the orchestrator would bypass the shared
+    // keep-alive pool and its timeouts that http.ts installs for the
+    // voter/judge fan-out.
     openaiClient = new OpenAI({
       apiKey: config.apiKey,
       baseURL: config.apiUrl,
+      // Cast: the SDK's node shims type `fetch` after node-fetch, but
+      // it accepts any fetch-compatible callable at runtime.
+      fetch: globalThis.fetch as any,
     });
   }
   return openaiClient;
 }
 
+/** API failure that remembers the HTTP status for retry classification. */
+export class ApiError extends Error {
+  constructor(message: string, readonly status?: number) {
+    super(message);
+    this.name = 'ApiError';
+  }
+}
+
+const MAX_API_RETRIES = 3;
+
+/**
+ * Transient failures (rate limits, server errors, network drops) are
+ * worth retrying; other 4xx responses are terminal — the request itself
+ * is wrong and a retry would waste a sample.
+ */
+function isRetryableError(error: unknown): boolean {
+  if (error instanceof ApiError) {
+    if (error.status === undefined) {
+      return true; // Network-level failure, no HTTP status
+    }
+    return error.status === 429 || error.status >= 500;
+  }
+  return false;
+}
+
+/**
+ * Fatal errors fail every sibling call too (bad key, no access to the
+ * model) — once one voter hits them there is no point letting the rest
+ * of a fan-out keep running.
+ */
+function isFatalError(error: unknown): boolean {
+  return (
+    error instanceof ApiError &&
+    (error.status === 401 || error.status === 403)
+  );
+}
+
+/**
+ * Retries `request` with jittered exponential backoff so a transient
+ * 429/5xx doesn't silently burn a sample of the voting budget.
+ */
+async function withRetries<T>(
+  request: () => Promise<T>,
+  signal?: AbortSignal
+): Promise<T> {
+  for (let attempt = 0; ; attempt++) {
+    try {
+      return await request();
+    } catch (error) {
+      if (signal?.aborted || attempt >= MAX_API_RETRIES - 1 || !isRetryableError(error)) {
+        throw error;
+      }
+      // Jitter spreads retries from concurrent voters apart so they
+      // don't re-stampede the API in sync.
+      const delayMs = (500 + Math.random() * 1000) * 2 ** attempt;
+      console.error(`[MAKER] Retrying after transient API error (attempt ${attempt + 1}, ${Math.round(delayMs)}ms)`);
+      await new Promise((resolve) => setTimeout(resolve, delayMs));
+    }
+  }
+}
+
 export async function createMessage(
   model: string,
   systemPrompt: string,
   userPrompt: string,
   temperature: number = 0.1,
-  maxTokens: number = 1024
+  maxTokens: number = 1024,
+  signal?: AbortSignal,
+  redFlagTokenLimit?: number
+): Promise<{ text: string; tokens: number }> {
+  // When a red-flag cap is given, stream the response so overlong
+  // generations can be aborted the moment they cross the cap instead of
+  // paying for every token up to max_tokens.
+  const request = redFlagTokenLimit !== undefined && config.streamVoting
+    ? (sig?: AbortSignal) =>
+        streamChatCompletion(model, systemPrompt, userPrompt, temperature, maxTokens, redFlagTokenLimit, sig)
+    : (sig?: AbortSignal) =>
+        requestChatCompletion(model, systemPrompt, userPrompt, temperature, maxTokens, sig);
+
+  // Deterministic (temperature 0) calls are always cacheable: the same
+  // (model, system, prompt) triple yields the same response. Raising
+  // MAKER_CACHE_MAX_TEMPERATURE opts low-temperature single-shot calls
+  // (judge, decomposer, code review) into the cache as well for repeat
+  // traffic. The single-flight layer also collapses concurrent
+  // identical calls (e.g. N voters all firing the same deterministic
+  // first sample) into one API request.
+  //
+  // Sampling-path calls must never share this tier above temperature 0:
+  // coalescing parallel voter samples onto one generation would hand
+  // first-to-ahead-by-k a single sample wearing k hats. Those calls are
+  // recognizable here — they thread an abort signal for sibling
+  // cancellation and/or a red-flag cap; single-shot calls pass neither.
+  //
+  // The abort signal is deliberately not forwarded on the cached path:
+  // a shared in-flight call must not be killed by one caller.
+  const sampled = signal !== undefined || redFlagTokenLimit !== undefined;
+  if (temperature === 0 || (!sampled && temperature <= config.cacheMaxTemperature)) {
+    const cacheKey = responseCache.makeKey(model, systemPrompt, userPrompt, temperature);
+    return responseCache.getOrCompute(cacheKey, () => withRetries(() => request()));
+  }
+
+  return withRetries(() => request(signal), signal);
+}
+
+/**
+ * Streaming variant of the chat-completion request that applies the
+ * token-length red flag online: once the running token estimate crosses
+ * `tokenLimit`, the stream is aborted and the result is returned with a
+ * token count just past the limit so checkRedFlags discards it — without
+ * paying for the rest of the generation.
+ */
+async function streamChatCompletion(
+  model: string,
+  systemPrompt: string,
+  userPrompt: string,
+  temperature: number,
+  maxTokens: number,
+  tokenLimit: number,
+  signal?: AbortSignal
 ): Promise<{ text: string; tokens: number }> {
   const url = `${config.apiUrl}chat/completions`;
 
+  // Dedicated controller so we can abort mid-stream; chained to the
+  // caller's signal for sibling cancellation.
+  const abort = new AbortController();
+  const onOuterAbort = () => abort.abort();
+  signal?.addEventListener('abort', onOuterAbort, { once: true });
+
+  let text = "";
+  let truncated = false;
+  let committed = false;
+  let usageTokens: number | null = null;
+
+  await llmSemaphore.acquire();
   try {
     const response = await fetch(url, {
       method: 'POST',
+      signal: abort.signal,
       headers: {
         'Content-Type': 'application/json',
         'Authorization': `Bearer ${config.apiKey}`,
@@ -109,35 +247,266 @@ export async function createMessage(
         ],
         temperature,
         max_tokens: maxTokens,
+        stream: true,
+        ...promptCacheFields(systemPrompt),
       }),
     });
 
-    if (!response.ok) {
+    if (!response.ok || !response.body) {
       const errorText = await response.text();
-      throw new Error(`${response.status} ${errorText}`);
+      throw new ApiError(`${response.status} ${errorText}`, response.status);
     }
 
-    const data = await response.json() as any;
+    const decoder = new TextDecoder();
+    let buffer = "";
 
-    const message = data.choices?.[0]?.message as any;
-    let text = message?.content || "";
-    const reasoningText = message?.reasoning_content || "";
+    outer:
+    for await (const chunk of response.body as unknown as AsyncIterable<Uint8Array>) {
+      buffer += decoder.decode(chunk, { stream: true });
 
-    if (reasoningText && text) {
-      text = text;
-    } else if (reasoningText && !text) {
-      text = reasoningText;
-    } else if (!reasoningText && !text) {
-      text = JSON.stringify(message);
-    }
+      let newline;
+      while ((newline = buffer.indexOf('\n')) !== -1) {
+        const line = buffer.slice(0, newline).trim();
+        buffer = buffer.slice(newline + 1);
+
+        if (!line.startsWith('data:')) {
+          continue;
+        }
+        const payload = line.slice(5).trim();
+        if (payload === '[DONE]') {
+          break outer;
+        }
+
+        let parsed: any;
+        try {
+          parsed = JSON.parse(payload);
+        } catch {
+          continue; // Partial/malformed SSE frame
+        }
+
+        const delta = parsed.choices?.[0]?.delta;
+        if (delta?.content) {
+          text += delta.content;
+        }
+        if (parsed.usage?.completion_tokens) {
+          usageTokens = parsed.usage.completion_tokens;
+        }
+
+        // Online red flag: this generation is already doomed, stop
+        // paying for its remaining tokens.
+        if (Math.ceil(text.length / 4) > tokenLimit) {
+          truncated = true;
+          abort.abort();
+          break outer;
+        }
 
-    const tokens = data.usage?.completion_tokens || Math.ceil(text.length / 4);
+        // Speculative early commit: once the extractor already has a
+        // stable answer, trailing commentary can't change the vote —
+        // cut the stream and count it now. Only worth checking on
+        // deltas that could complete a closing fence.
+        if (delta?.content && delta.content.includes('`') && hasStableAnswer(text)) {
+          committed = true;
+          abort.abort();
+          break outer;
+        }
+      }
+    }
 
+    const tokens = truncated
+      ? tokenLimit + 1
+      : usageTokens ?? Math.ceil(text.length / 4);
     return { text, tokens };
+  } catch (error) {
+    // An abort we triggered ourselves is a valid truncation, not a failure
+    if (truncated) {
+      return { text, tokens: tokenLimit + 1 };
+    }
+    if (committed) {
+      return { text, tokens: Math.ceil(text.length / 4) };
+    }
+    const errorMessage = error instanceof Error ? error.message : String(error);
+    console.error(`[MAKER] API error: ${errorMessage}`);
+    if (error instanceof ApiError) {
+      throw error;
+    }
+    throw new ApiError(`API error: ${errorMessage}`);
+  } finally {
+    signal?.removeEventListener('abort', onOuterAbort);
+    llmSemaphore.release();
+  }
+}
+
+/**
+ * Optional server-side prefix-cache hint. The Anthropic-style
+ * cache_control blocks from the request don't exist on the
+ * chat-completions API; the equivalent here is prompt_cache_key, which
+ * keys cache routing so every call sharing a system prompt (all voters
+ * in a round, every judge call) lands on the same warm prefix.
+ */
+function promptCacheFields(systemPrompt: string): Record<string, string> {
+  return config.promptCacheKey
+    ? { prompt_cache_key: fnv1a64(systemPrompt) }
+    : {};
+}
+
+function extractChoiceText(message: any): string {
+  let text = message?.content || "";
+  const reasoningText = message?.reasoning_content || "";
+
+  if (reasoningText && !text) {
+    text = reasoningText;
+  } else if (!reasoningText && !text) {
+    text = JSON.stringify(message);
+  }
+
+  return text;
+}
+
+async function requestChatCompletionChoices(
+  model: string,
+  systemPrompt: string,
+  userPrompt: string,
+  temperature: number,
+  maxTokens: number,
+  n: number,
+  signal?: AbortSignal
+): Promise<Array<{ text: string; tokens: number }>> {
+  const url = `${config.apiUrl}chat/completions`;
+
+  await llmSemaphore.acquire();
+  try {
+    const response = await fetch(url, {
+      method: 'POST',
+      signal,
+      headers: {
+        'Content-Type': 'application/json',
+        'Authorization': `Bearer ${config.apiKey}`,
+      },
+      body: JSON.stringify({
+        model,
+        messages: [
+          { role: "system", content: systemPrompt },
+          { role: "user", content: userPrompt },
+        ],
+        temperature,
+        max_tokens: maxTokens,
+        ...(n > 1 ? { n } : {}),
+        ...promptCacheFields(systemPrompt),
+      }),
+    });
+
+    if (!response.ok) {
+      const errorText = await response.text();
+      throw new ApiError(`${response.status} ${errorText}`, response.status);
+    }
+
+    const data = await response.json() as any;
+    const choices = (data.choices ?? []) as any[];
+
+    return choices.map((choice) => {
+      const text = extractChoiceText(choice?.message);
+      // usage.completion_tokens is the total across all choices, so for
+      // multi-sample requests fall back to the length estimate per choice
+      const tokens = n === 1
+        ? data.usage?.completion_tokens || Math.ceil(text.length / 4)
+        : Math.ceil(text.length / 4);
+      return { text, tokens };
+    });
   } catch (error) {
     const errorMessage = error instanceof Error ? error.message : String(error);
     console.error(`[MAKER] API error: ${errorMessage}`);
-    throw new Error(`API error: ${errorMessage}`);
+    if (error instanceof ApiError) {
+      throw error;
+    }
+    throw new ApiError(`API error: ${errorMessage}`);
+  } finally {
+    llmSemaphore.release();
+  }
+}
+
+async function requestChatCompletion(
+  model: string,
+  systemPrompt: string,
+  userPrompt: string,
+  temperature: number,
+  maxTokens: number,
+  signal?: AbortSignal
+): Promise<{ text: string; tokens: number }> {
+  const [first] = await requestChatCompletionChoices(
+    model, systemPrompt, userPrompt, temperature, maxTokens, 1, signal
+  );
+  if (!first) {
+    throw new ApiError('API error: response contained no choices');
+  }
+  return first;
+}
+
+// Set once a backend rejects n > 1 so we don't waste a roundtrip
+// re-discovering it on every batch.
+let multiSamplingUnsupported = false;
+
+// Error bodies that blame the n parameter itself, e.g. "Unsupported
+// parameter: 'n'" or "Unrecognized request argument supplied: n".
+const N_PARAM_ERROR_RE =
+  /(?:unsupported|unrecognized|unknown|invalid)[^.]*(?:param|argument)[^.]*[\s'"`]n(?:[\s'"`.,]|$)/i;
+
+/**
+ * Requests `n` samples of the same prompt in one HTTP call via the
+ * chat-completions `n` parameter, so identical-prompt samples share a
+ * single request's connection, queueing, and prompt processing. Not
+ * every OpenAI-compatible backend implements `n`; on a terminal client
+ * error the call transparently falls back to parallel single-sample
+ * requests and remembers the rejection.
+ */
+export async function createMessageBatch(
+  model: string,
+  systemPrompt: string,
+  userPrompt: string,
+  temperature: number,
+  maxTokens: number,
+  n: number,
+  signal?: AbortSignal
+): Promise<Array<{ text: string; tokens: number }>> {
+  const single = () =>
+    createMessage(model, systemPrompt, userPrompt, temperature, maxTokens, signal);
+  const fallback = () => Promise.all(Array.from({ length: n }, single));
+
+  if (n <= 1 || multiSamplingUnsupported) {
+    return fallback();
+  }
+
+  try {
+    return await withRetries(
+      () => requestChatCompletionChoices(model, systemPrompt, userPrompt, temperature, maxTokens, n, signal),
+      signal
+    );
+  } catch (error) {
+    // Auth failures say nothing about n>1 support, and the single-shot
+    // fallback would just replay them N times — propagate instead.
+    const status = error instanceof ApiError ? error.status : undefined;
+    const terminal4xx =
+      status !== undefined && status >= 400 && status < 500 &&
+      status !== 429 && !isFatalError(error);
+    if (!terminal4xx) {
+      throw error;
+    }
+
+    if (error instanceof ApiError && N_PARAM_ERROR_RE.test(error.message)) {
+      // The backend named the n parameter itself — safe to latch.
+      multiSamplingUnsupported = true;
+      console.error('[MAKER] Backend rejected n>1 sampling; falling back to parallel single requests');
+      return fallback();
+    }
+
+    // Ambiguous 4xx (context length, bad model name, ...): probe with
+    // one single-sample request before latching or fanning out. If the
+    // probe fails too, n wasn't the problem — its error carries the
+    // real cause. If it succeeds, only n could have differed.
+    const probe = await single();
+    multiSamplingUnsupported = true;
+    console.error('[MAKER] Backend rejected n>1 sampling; falling back to parallel single requests');
+    const rest = await Promise.all(Array.from({ length: n - 1 }, single));
+    return [probe, ...rest];
   }
 }
 
@@ -145,6 +514,22 @@ export async function createMessage(
 // RED-FLAGGING (Section 3.3 of the paper)
 // ============================================================================
 
+const NON_WHITESPACE_RE = /\S/;
+
+/**
+ * Allocation-free red-flag predicate for the voting hot loop: the
+ * per-sample tally only needs a verdict, not a result object with a
+ * formatted reason, and the emptiness test must not trim() a copy of a
+ * multi-KB response.
+ */
+export function isRedFlagged(
+  response: string,
+  numTokens: number,
+  maxTokens: number
+): boolean {
+  return numTokens > maxTokens || !NON_WHITESPACE_RE.test(response);
+}
+
 export function checkRedFlags(
   response: string,
   numTokens: number,
@@ -158,7 +543,7 @@ export function checkRedFlags(
     };
   }
 
-  if (!response.trim()) {
+  if (!NON_WHITESPACE_RE.test(response)) {
     return {
       isValid: false,
       reason: "Empty response",
@@ -176,20 +561,218 @@ export function checkRedFlags(
 // FIRST-TO-AHEAD-BY-K VOTING (Section 3.2 of the paper)
 // ============================================================================
 
+// Compiled once at module load — extractAnswer runs for every voter
+// sample, so per-call regex construction and the multi-pass marker scan
+// add up across batch_size x max_rounds samples.
+const CODE_BLOCK_RE = /```(?:\w+)?\n([\s\S]*?)```/;
+
+// Fixed marker precedence: an earlier marker in this list wins even if
+// a later one appears first in the response, and a repeated marker ends
+// the captured answer — both match the original extractor's
+// includes/split behavior.
+const ANSWER_MARKERS = ["Response:", "Solution:", "Answer:", "Result:"];
+
+/**
+ * True once a partial response already contains everything extractAnswer
+ * will use, so the rest of the generation can be skipped. Only a closed
+ * ``` code fence qualifies: the extractor always keeps the first fenced
+ * block, so nothing generated later can change the result. Marker
+ * answers are deliberately not early-committed — a later fence or a
+ * higher-precedence marker would override them, and cutting there would
+ * split identical generations into different vote candidates depending
+ * on where the stream chunks happened to fall.
+ */
+function hasStableAnswer(text: string): boolean {
+  return CODE_BLOCK_RE.test(text);
+}
+
+// Identical response bodies recur whenever the deterministic first
+// sample or a cache hit repeats across voters — memoize the extraction
+// so multi-KB responses are only scanned once. Keys are FNV-1a digests
+// of the response, not the response itself, so the memo holds only the
+// extracted answers rather than retaining every multi-KB response body.
+const EXTRACT_MEMO_MAX = 2048;
+const extractMemo: Map<string, string> = new Map();
+
 export function extractAnswer(response: string): string {
-  const codeMatch = response.match(/```(?:\w+)?\n([\s\S]*?)```/);
+  // Short responses are cheaper to re-scan than to memoize
+  if (response.length < 256) {
+    return doExtractAnswer(response);
+  }
+
+  const digest = fnv1a64(response);
+  const memoized = extractMemo.get(digest);
+  if (memoized !== undefined) {
+    return memoized;
+  }
+
+  const answer = doExtractAnswer(response);
+  if (extractMemo.size >= EXTRACT_MEMO_MAX) {
+    const oldest = extractMemo.keys().next().value;
+    if (oldest !== undefined) {
+      extractMemo.delete(oldest);
+    }
+  }
+  extractMemo.set(digest, answer);
+  return answer;
+}
+
+/**
+ * Canonicalizes an extracted answer for vote keying: normalizes CRLF to
+ * LF and strips trailing whitespace from each line. Samples that differ
+ * only in line endings or invisible padding should vote for the same
+ * candidate instead of splitting the tally.
+ */
+function canonicalizeAnswer(answer: string): string {
+  return answer.replace(/\r\n?/g, "\n").replace(/[ \t]+$/gm, "");
+}
+
+function doExtractAnswer(response: string): string {
+  const codeMatch = CODE_BLOCK_RE.exec(response);
   if (codeMatch) {
-    return codeMatch[1].trim();
+    return canonicalizeAnswer(codeMatch[1].trim());
   }
 
-  const markers = ["Response:", "Solution:", "Answer:", "Result:"];
-  for (const marker of markers) {
-    if (response.includes(marker)) {
-      return response.split(marker)[1].trim();
+  for (const marker of ANSWER_MARKERS) {
+    const idx = response.indexOf(marker);
+    if (idx !== -1) {
+      const start = idx + marker.length;
+      // split(marker)[1] equivalent without materializing every segment
+      const next = response.indexOf(marker, start);
+      const answer = next === -1 ? response.slice(start) : response.slice(start, next);
+      return canonicalizeAnswer(answer.trim());
     }
   }
 
-  return response.trim();
+  return canonicalizeAnswer(response.trim());
+}
+
+/**
+ * Locates the first ```json fence with plain forward index scans —
+ * two native indexOf passes instead of a backtracking regex over the
+ * whole response.
+ */
+function findFencedJson(response: string): string | null {
+  const open = response.indexOf("```json");
+  if (open === -1) {
+    return null;
+  }
+  const start = open + "```json".length;
+  const close = response.indexOf("```", start);
+  if (close === -1) {
+    return null;
+  }
+  return response.slice(start, close).trim();
+}
+
+/**
+ * Extracts the first JSON object from a model response. Fenced
+ * ```json blocks take priority, then the widest brace-delimited span.
+ * Returns null when the response contains no object at all.
+ */
+export function extractJson(response: string): string | null {
+  const fenced = findFencedJson(response);
+  if (fenced !== null) {
+    return fenced;
+  }
+  // Widest brace span: first "{" to last "}".
+  const start = response.indexOf("{");
+  if (start === -1) {
+    return null;
+  }
+  const end = response.lastIndexOf("}");
+  return end > start ? response.slice(start, end + 1) : null;
+}
+
+/**
+ * Incremental vote tally with O(1) winner detection.
+ *
+ * Tracks the top-1 and top-2 vote counts as votes arrive, so the
+ * first-to-ahead-by-k check is a single comparison instead of a full
+ * scan over every candidate on every sample.
+ *
+ * Candidates are keyed by a 16-char FNV-1a digest of the canonical
+ * answer, so tally keys stay constant-size no matter how large the
+ * answers are (code answers routinely run to multiple KB). The
+ * representative text for each digest lives in a side table used only
+ * for reporting.
+ */
+export class VoteTracker {
+  private counts: Map<string, number> = new Map();
+  private answers: Map<string, string> = new Map();
+  private top1: string | null = null; // digest of the current leader
+  private top1Votes = 0;
+  private top2Votes = 0;
+
+  /**
+   * Records one vote for `candidate` and returns true if the candidate
+   * is now ahead of every other candidate by at least `k` votes.
+   */
+  recordVote(candidate: string, k: number): boolean {
+    const digest = fnv1a64(candidate);
+    if (!this.answers.has(digest)) {
+      this.answers.set(digest, candidate);
+    }
+    const count = (this.counts.get(digest) || 0) + 1;
+    this.counts.set(digest, count);
+
+    if (digest === this.top1) {
+      this.top1Votes = count;
+    } else if (count > this.top1Votes) {
+      // The previous leader becomes the runner-up
+      this.top2Votes = this.top1Votes;
+      this.top1 = digest;
+      this.top1Votes = count;
+    } else if (count > this.top2Votes) {
+      this.top2Votes = count;
+    }
+
+    return this.top1Votes >= this.top2Votes + k;
+  }
+
+  /** Current leading candidate ("" if no votes yet). */
+  get leader(): string {
+    return this.top1 !== null ? this.answers.get(this.top1) ?? "" : "";
+  }
+
+  /** Current margin between the leader and the runner-up. */
+  get lead(): number {
+    return this.top1Votes - this.top2Votes;
+  }
+
+  /** Vote count for a given answer text. */
+  votesFor(answer: string): number {
+    return this.counts.get(fnv1a64(answer)) || 0;
+  }
+
+  /** Number of distinct candidates seen. */
+  get size(): number {
+    return this.counts.size;
+  }
+
+  /**
+   * Returns the top `n` candidates by vote count (descending) in a
+   * single pass over the tally — no full sort of the candidate map.
+   */
+  topCandidates(n: number): Array<[string, number]> {
+    const top: Array<[string, number]> = [];
+    for (const [digest, count] of this.counts) {
+      let i = top.length;
+      while (i > 0 && top[i - 1][1] < count) {
+        i--;
+      }
+      if (i < n) {
+        top.splice(i, 0, [digest, count]);
+        if (top.length > n) {
+          top.pop();
+        }
+      }
+    }
+    return top.map(([digest, count]): [string, number] => [
+      this.answers.get(digest) ?? "",
+      count,
+    ]);
+  }
 }
 
 export async function firstToAheadByKVoting(
@@ -199,13 +782,15 @@ export async function firstToAheadByKVoting(
   k: number = 3,
   temperature: number = 0.1
 ): Promise<{ winner: string; state: VotingState }> {
-  const startTime = Date.now();
+  const startTime = performance.now();
+  const tracker = new VoteTracker();
   const state: VotingState = {
-    votes: new Map(),
+    votes: tracker,
     totalSamples: 0,
     validSamples: 0,
     redFlagged: 0,
     elapsedTime: 0,
+    earlyTerminated: false,
   };
 
   // First deterministic sample (temperature=0)
@@ -215,19 +800,19 @@ export async function firstToAheadByKVoting(
       systemPrompt,
       prompt,
       0,
-      config.maxTokens + 100
+      config.voterMaxTokens + 100,
+      undefined,
+      config.voterMaxTokens
     );
     state.totalSamples++;
 
-    const flagResult = checkRedFlags(text, tokens, config.maxTokens);
-    if (flagResult.isValid) {
+    if (!isRedFlagged(text, tokens, config.voterMaxTokens)) {
       const canonical = extractAnswer(text);
       if (canonical) {
         state.validSamples++;
-        state.votes.set(canonical, (state.votes.get(canonical) || 0) + 1);
 
-        if (checkWinner(state.votes, canonical, k)) {
-          state.elapsedTime = (Date.now() - startTime) / 1000;
+        if (tracker.recordVote(canonical, k)) {
+          state.elapsedTime = (performance.now() - startTime) / 1000;
           return { winner: canonical, state };
         }
       }
@@ -238,76 +823,117 @@ export async function firstToAheadByKVoting(
     state.redFlagged++;
   }
 
-  // Parallel Samples (batch execution)
-  const pendingSamples = config.maxRounds - state.totalSamples;
-  const BATCH_SIZE = 5; // Adjust as needed for rate limits
-
-  for (let i = 0; i < pendingSamples; i += BATCH_SIZE) {
-    const currentBatchSize = Math.min(BATCH_SIZE, pendingSamples - i);
-    const promises = Array.from({ length: currentBatchSize }, () =>
-      createMessage(
+  // Parallel sampling via a persistent worker pool: a finished worker
+  // immediately claims the next sample instead of idling until the rest
+  // of its batch completes, so there are no batch-boundary stalls and no
+  // per-batch task churn.
+  let samplesRemaining = config.maxRounds - state.totalSamples;
+  const POOL_SIZE = 5; // Concurrent samples; adjust as needed for rate limits
+
+  // One controller for the whole run: the moment a winner is decided we
+  // abort every in-flight request instead of letting the pool drain.
+  const abort = new AbortController();
+  let winner: string | null = null;
+  let fatalError: ApiError | null = null;
+
+  const runSample = async (): Promise<void> => {
+    let result: { text: string; tokens: number };
+    try {
+      result = await createMessage(
         model,
         systemPrompt,
         prompt,
         temperature,
-        config.maxTokens + 100
-      ).catch(() => null) // Suppress errors in Promise.all to handle them individually
-    );
-
-    const batchResults = await Promise.all(promises);
-
-    for (const result of batchResults) {
-      if (!result) {
+        config.voterMaxTokens + 100,
+        abort.signal,
+        config.voterMaxTokens
+      );
+    } catch (error) {
+      // Auth-style failures hit every sibling identically — cancel the
+      // run instead of burning the rest of the budget on them.
+      if (isFatalError(error)) {
+        fatalError = error as ApiError;
+        abort.abort();
+        return;
+      }
+      // Cancelled samples don't count against the budget
+      if (!abort.signal.aborted) {
         state.redFlagged++;
-        continue;
       }
+      return;
+    }
 
-      state.totalSamples++;
-      const flagResult = checkRedFlags(result.text, result.tokens, config.maxTokens);
+    if (abort.signal.aborted) {
+      return; // A sibling already decided the winner
+    }
 
-      if (flagResult.isValid) {
-        const canonical = extractAnswer(result.text);
-        if (canonical) {
-          state.validSamples++;
-          state.votes.set(canonical, (state.votes.get(canonical) || 0) + 1);
+    state.totalSamples++;
 
-          if (checkWinner(state.votes, canonical, k)) {
-            state.elapsedTime = (Date.now() - startTime) / 1000;
-            return { winner: canonical, state };
-          }
+    if (!isRedFlagged(result.text, result.tokens, config.voterMaxTokens)) {
+      const canonical = extractAnswer(result.text);
+      if (canonical) {
+        state.validSamples++;
+
+        if (tracker.recordVote(canonical, k)) {
+          winner = canonical;
+          abort.abort();
         }
-      } else {
-        state.redFlagged++;
       }
+    } else {
+      state.redFlagged++;
     }
-  }
-
-  state.elapsedTime = (Date.now() - startTime) / 1000;
+  };
 
-  let maxVotes = 0;
-  let winner = "";
-  for (const [candidate, votes] of state.votes) {
-    if (votes > maxVotes) {
-      maxVotes = votes;
-      winner = candidate;
+  let inFlight = 0;
+
+  const worker = async (workerId: number): Promise<void> => {
+    while (samplesRemaining > 0 && !winner && !fatalError) {
+      // Adaptive mode: shrink the pool to the number of votes the
+      // leader still needs to close the k-margin. Surplus workers idle
+      // rather than retire — the margin shrinks again whenever the
+      // runner-up catches up, and the pool must be able to grow back.
+      // The active size never drops below one worker.
+      if (config.adaptiveBatch && workerId >= Math.max(1, k - tracker.lead)) {
+        await new Promise((resolve) => setTimeout(resolve, 50));
+        continue;
+      }
+      samplesRemaining--;
+      inFlight++;
+      await runSample();
+      inFlight--;
+
+      // Mathematical stop: even if every remaining and in-flight sample
+      // voted for the runner-up, it could no longer catch the leader —
+      // the outcome is decided, so stop paying for samples.
+      const budget = samplesRemaining + inFlight;
+      if (!winner && tracker.lead > budget) {
+        state.earlyTerminated = true;
+        state.earlyTerminationReason =
+          `lead of ${tracker.lead} exceeds remaining budget of ${budget}`;
+        winner = tracker.leader;
+        abort.abort();
+      }
     }
-  }
-
-  return { winner, state };
-}
+  };
 
+  await Promise.all(
+    Array.from({ length: Math.min(POOL_SIZE, samplesRemaining) }, (_, i) => worker(i))
+  );
 
-export function checkWinner(votes: Map<string, number>, candidate: string, k: number): boolean {
-  const currentVotes = votes.get(candidate) || 0;
-  let maxOtherVotes = 0;
+  if (fatalError && !winner) {
+    throw fatalError;
+  }
 
-  for (const [key, v] of votes) {
-    if (key !== candidate && v > maxOtherVotes) {
-      maxOtherVotes = v;
-    }
+  if (winner) {
+    state.elapsedTime = (performance.now() - startTime) / 1000;
+    return { winner, state };
   }
 
-  return currentVotes >= k + maxOtherVotes;
+  state.elapsedTime = (performance.now() - startTime) / 1000;
+
+  // Budget exhausted without a k-margin: the tracker already knows the
+  // plurality leader, no need to rescan the tally.
+  return { winner: tracker.leader, state };
 }
 
 // ============================================================================
@@ -427,6 +1053,14 @@ OUTPUT FORMAT (JSON):
 // CLEAN RESPONSE EXTRACTION
 // ============================================================================
 
+// Report-section patterns, hoisted to module scope like the answer
+// extraction regexes above.
+const JUDGE_DECISION_RE = /## Decisão Final do Juiz\s*\n\n([\s\S]*?)(?=\n## |$)/;
+const DECISION_RE = /## Decisão\s*\n\n?([\s\S]*?)(?=\n## |$)/;
+const WINNER_RE = /## Winning Response\s*\n\n([\s\S]*?)(?=\n## |$)/;
+const ANALYSIS_DECISION_RE = /## Análise[\s\S]*?## Decisão\s*\n\n?([\s\S]*?)(?=\n## |$)/;
+const REPORT_HEADER_RE = /# MAKER-Council Report[\s\S]*?## Decisão Final do Juiz\s*\n\n/;
+
 /**
  * Extracts only the useful response from the result, removing metadata and technical reports.
  */
@@ -437,31 +1071,31 @@ export function extractCleanResponse(rawResult: string): string {
   }
 
   // Try to extract the final judge's decision
-  const judgeDecisionMatch = rawResult.match(/## Decisão Final do Juiz\s*\n\n([\s\S]*?)(?=\n## |$)/);
+  const judgeDecisionMatch = rawResult.match(JUDGE_DECISION_RE);
   if (judgeDecisionMatch) {
     return judgeDecisionMatch[1].trim();
   }
 
   // Try to extract the "## Decisão" section
-  const decisionMatch = rawResult.match(/## Decisão\s*\n\n?([\s\S]*?)(?=\n## |$)/);
+  const decisionMatch = rawResult.match(DECISION_RE);
   if (decisionMatch) {
     return decisionMatch[1].trim();
   }
 
   // Try to extract "Winning Response" (for solve_with_voting)
-  const winnerMatch = rawResult.match(/## Winning Response\s*\n\n([\s\S]*?)(?=\n## |$)/);
+  const winnerMatch = rawResult.match(WINNER_RE);
   if (winnerMatch) {
     return winnerMatch[1].trim();
   }
 
   // If there's an Analysis section followed by a Decision, get the Decision
-  const analysisDecisionMatch = rawResult.match(/## Análise[\s\S]*?## Decisão\s*\n\n?([\s\S]*?)(?=\n## |$)/);
+  const analysisDecisionMatch = rawResult.match(ANALYSIS_DECISION_RE);
   if (analysisDecisionMatch) {
     return analysisDecisionMatch[1].trim();
   }
 
   // Fallback: remove the report header and return the rest
-  const withoutHeader = rawResult.replace(/# MAKER-Council Report[\s\S]*?## Decisão Final do Juiz\s*\n\n/, '');
+  const withoutHeader = rawResult.replace(REPORT_HEADER_RE, '');
   if (withoutHeader !== rawResult) {
     return withoutHeader.trim();
   }
@@ -512,7 +1146,7 @@ export function buildFullPrompt(prompt: string, context?: QueryContext): string
 }
 
 export async function handleQuery(request: QueryRequest): Promise<QueryResponse> {
-  const startTime = Date.now();
+  const startTime = performance.now();
   const requestId = generateRequestId();
 
   // Log Request
@@ -536,7 +1170,7 @@ export async function handleQuery(request: QueryRequest): Promise<QueryResponse>
   if (currentDepth > config.maxRecursionDepth) {
     console.error(`[LOGIC] Max recursion depth reached (${currentDepth}). Aborting.`);
     const errorMsg = "Max recursion depth reached.";
-    logger.updateRequestStatus(requestId, 'error', Date.now() - startTime);
+    logger.updateRequestStatus(requestId, 'error', Math.round(performance.now() - startTime));
     logger.log({ request_id: requestId, level: 'error', message: errorMsg });
     return {
       result: `Error: Maximum recursion depth reached. The agent loop was terminated to prevent infinite loops.`,
@@ -555,7 +1189,7 @@ export async function handleQuery(request: QueryRequest): Promise<QueryResponse>
   // Fast path for simple greetings - bypass tool dispatcher
   if (isSimpleGreeting(request.prompt)) {
     console.error('[LOGIC] Simple greeting detected. Bypassing tool dispatcher.');
-    const duration = Date.now() - startTime;
+    const duration = Math.round(performance.now() - startTime);
     const totalTime = duration / 1000;
     
     logger.updateRequestStatus(requestId, 'success', duration);
@@ -618,12 +1252,20 @@ export async function handleQuery(request: QueryRequest): Promise<QueryResponse>
     iterations++;
 
     const client = getClient();
-    const response = await client.chat.completions.create({
-      model: config.judgeModel,
-      messages,
-      tools: internalTools,
-      tool_choice: 'auto',
-    });
+    // Orchestrator calls go through the same gate as the voter/judge
+    // fan-out so nested consult_council runs can't exceed the cap.
+    await llmSemaphore.acquire();
+    let response;
+    try {
+      response = await client.chat.completions.create({
+        model: config.judgeModel,
+        messages,
+        tools: internalTools,
+        tool_choice: 'auto',
+      });
+    } finally {
+      llmSemaphore.release();
+    }
 
     const choice = response.choices[0];
     const message = choice.message;
@@ -666,7 +1308,7 @@ export async function handleQuery(request: QueryRequest): Promise<QueryResponse>
 
     // Execute Tool
     const toolCallId = generateRequestId();
-    const toolStartTime = Date.now();
+    const toolStartTime = performance.now();
     let toolOutput: string;
     let toolError: string | undefined;
 
@@ -684,7 +1326,7 @@ export async function handleQuery(request: QueryRequest): Promise<QueryResponse>
       toolOutput = `Error execution exception: ${toolError}`;
     }
 
-    const toolDuration = Date.now() - toolStartTime;
+    const toolDuration = Math.round(performance.now() - toolStartTime);
     try {
       logger.logToolCall({
         id: toolCallId,
@@ -716,7 +1358,7 @@ export async function handleQuery(request: QueryRequest): Promise<QueryResponse>
     }
   }
 
-  const duration = Date.now() - startTime;
+  const duration = Math.round(performance.now() - startTime);
   const totalTime = duration / 1000;
   const raw_output_for_metadata = typeof finalResult === 'string' ? finalResult : JSON.stringify(finalResult);
 
@@ -752,32 +1394,163 @@ function intentToToolName(intent: Intent): string {
   }
 }
 
+// Fraction of the council whose proposals are enough to start the judge
+// under MAKER_QUORUM_JUDGE.
+const JUDGE_QUORUM_FRACTION = 0.7;
+
+/**
+ * Fans the council out as individual voter calls and resolves once a
+ * quorum of proposals has arrived (or every voter has settled),
+ * aborting the stragglers — the judge starts ~(max - median) voter
+ * latency earlier than waiting out the slowest tail voter.
+ */
+async function collectQuorumProposals(
+  model: string,
+  query: string,
+  temperature: number,
+  voters: number
+): Promise<string[]> {
+  const abort = new AbortController();
+  const quorum = Math.max(1, Math.ceil(voters * JUDGE_QUORUM_FRACTION));
+  const proposals: string[] = [];
+  let fatal: ApiError | null = null;
+
+  // First voter deterministic (cache/single-flight), the rest sampled —
+  // same shape as the batched path, but one task per voter so each
+  // proposal can be counted the moment it lands.
+  const tasks = Array.from({ length: voters }, (_, i) =>
+    i === 0
+      ? createMessage(model, VOTER_SYSTEM_PROMPT, query, 0)
+      : createMessage(model, VOTER_SYSTEM_PROMPT, query, temperature, 1024, abort.signal)
+  );
+
+  await new Promise<void>((resolve) => {
+    let settledCount = 0;
+    for (const task of tasks) {
+      task
+        .then((r) => {
+          proposals.push(r.text);
+        })
+        .catch((error) => {
+          // A failed or aborted voter just doesn't contribute, but a
+          // fatal error (bad key) fails every sibling — cancel them.
+          if (isFatalError(error)) {
+            fatal = error as ApiError;
+            abort.abort();
+          }
+        })
+        .finally(() => {
+          settledCount++;
+          if (proposals.length >= quorum || settledCount === tasks.length) {
+            resolve();
+          }
+        });
+    }
+  });
+
+  // Stragglers past the quorum can no longer reach the judge.
+  abort.abort();
+  if (proposals.length === 0 && fatal) {
+    throw fatal;
+  }
+  return proposals.slice();
+}
+
 async function internalHandleConsultCouncil(query: string, num_voters?: number, k?: number): Promise<string> {
   const voters = num_voters || 3; // Default to 3 if not provided
   const model = config.voterModel;
   const temp = 0.1; // Default temperature
   const judgeModel = config.judgeModel;
-  const startTime = Date.now();
+  const startTime = performance.now();
+
+  let proposals: string[];
+  if (config.quorumJudge && voters > 2) {
+    proposals = await collectQuorumProposals(model, query, temp, voters);
+  } else {
+    // The first proposal is deterministic (temperature 0): it flows
+    // through the response cache and single-flight layer, so repeated or
+    // concurrent consults of the same query get it without an API call.
+    // The remaining voters sample at the usual temperature for diversity,
+    // multiplexed into a single n-sample request where the backend
+    // supports it.
+    // allSettled instead of all: a failed voter arm shouldn't reject the
+    // whole council — the judge can rule on the proposals that did
+    // arrive. Fatal errors are the exception: they fail both arms
+    // identically, so the first one cancels the sibling.
+    const abort = new AbortController();
+    const cancelSiblingsOnFatal = <T>(arm: Promise<T>): Promise<T> =>
+      arm.catch((error) => {
+        if (isFatalError(error)) {
+          abort.abort();
+        }
+        throw error;
+      });
+    const [deterministic, sampled] = await Promise.allSettled([
+      cancelSiblingsOnFatal(
+        createMessage(model, VOTER_SYSTEM_PROMPT, query, 0, 1024, abort.signal)
+      ),
+      cancelSiblingsOnFatal(
+        createMessageBatch(model, VOTER_SYSTEM_PROMPT, query, temp, 1024, voters - 1, abort.signal)
+      ),
+    ]);
+
+    proposals = [];
+    if (deterministic.status === 'fulfilled') {
+      proposals.push(deterministic.value.text);
+    }
+    if (sampled.status === 'fulfilled') {
+      proposals.push(...sampled.value.map(r => r.text));
+    }
 
-  const proposalPromises = Array.from({ length: voters }, () =>
-    createMessage(model, VOTER_SYSTEM_PROMPT, query, temp)
-  );
-  const results = await Promise.all(proposalPromises);
-  const proposals = results.map(r => r.text);
-
-  const judgePrompt = `QUESTION: "${query}"\n\nPROPOSALS:\n\n${proposals
-    .map((p, i) => `--- PROPOSAL ${i + 1} ---\n${p}`)
-    .join("\n\n")}`;
-
-  const { text: judgeDecision } = await createMessage(
-    judgeModel,
-    JUDGE_SYSTEM_PROMPT,
-    judgePrompt,
-    0.2
-  );
+    if (proposals.length === 0) {
+      // Surface the real cause instead of a generic failure
+      for (const arm of [deterministic, sampled]) {
+        if (arm.status === 'rejected' && isFatalError(arm.reason)) {
+          throw arm.reason;
+        }
+      }
+    }
+  }
 
-  const elapsedTime = (Date.now() - startTime) / 1000;
-  const result = `# MAKER-Council Report\n\n## Final Judge's Decision\n\n${judgeDecision}\n\n---\n*Report: ${voters} voters, took ${elapsedTime.toFixed(2)}s*`;
+  if (proposals.length === 0) {
+    throw new Error('All voters failed to produce a proposal');
+  }
+
+  // Consensus short-circuit: when every proposal extracts to the same
+  // canonical answer there is nothing for the judge to arbitrate —
+  // asking a bigger model to "synthesize" a unanimous answer wastes a
+  // full judge round trip.
+  const firstAnswer = extractAnswer(proposals[0]);
+  const unanimous =
+    proposals.length > 1 &&
+    proposals.every((p) => extractAnswer(p) === firstAnswer);
+
+  let judgeDecision: string;
+  let judgeNote = "";
+  if (unanimous) {
+    judgeDecision = proposals[0];
+    judgeNote = ", judge skipped (consensus)";
+  } else {
+    // Assemble the judge prompt in one flat join: pushing each header and
+    // proposal as separate parts avoids building an intermediate prefixed
+    // copy of every (potentially multi-KB) proposal before concatenation.
+    const judgePromptParts: string[] = [`QUESTION: "${query}"\n\nPROPOSALS:`];
+    proposals.forEach((p, i) => {
+      judgePromptParts.push(`\n\n--- PROPOSAL ${i + 1} ---\n`, p);
+    });
+    const judgePrompt = judgePromptParts.join("");
+
+    ({ text: judgeDecision } = await createMessage(
+      judgeModel,
+      JUDGE_SYSTEM_PROMPT,
+      judgePrompt,
+      0.2
+    ));
+  }
+
+  const elapsedTime = (performance.now() - startTime) / 1000;
+  const cacheStats = responseCache.stats();
+  const result = `# MAKER-Council Report\n\n## Final Judge's Decision\n\n${judgeDecision}\n\n---\n*Report: ${voters} voters${judgeNote}, took ${elapsedTime.toFixed(2)}s, cache ${cacheStats.hits} hits / ${cacheStats.misses} misses*`;
   return result;
 }
 
@@ -834,7 +1607,20 @@ async function internalHandleSolveWithVoting(query: string, k?: number): Promise
     k || config.k,
     0.1 // Default temperature
   );
-  const result = `# First-to-ahead-by-${state.votes.get(winner)} Voting Result\n\n## Winning Response\n\n${winner}\n\n---\n*Report: ${state.validSamples}/${state.totalSamples} samples valid, ${state.redFlagged} red-flagged, took ${state.elapsedTime.toFixed(2)}s*`;
+  const earlyNote = state.earlyTerminated
+    ? `, early-terminated (${state.earlyTerminationReason})`
+    : '';
+  // Vote distribution via the tracker's single-pass top-n selection —
+  // no full sort of the candidate tally. Previews keep the block
+  // readable when candidates are multi-line code answers.
+  const distribution = state.votes
+    .topCandidates(5)
+    .map(([answer, count], i) => {
+      const preview = answer.split('\n', 1)[0].slice(0, 60);
+      return `- Candidate ${i + 1}: ${count} vote${count === 1 ? '' : 's'} — ${preview}`;
+    })
+    .join('\n');
+  const result = `# First-to-ahead-by-${state.votes.votesFor(winner)} Voting Result\n\n## Winning Response\n\n${winner}\n\n## Vote Distribution\n\n${distribution}\n\n---\n*Report: ${state.validSamples}/${state.totalSamples} samples valid, ${state.redFlagged} red-flagged${earlyNote}, took ${state.elapsedTime.toFixed(2)}s*`;
   return result;
 }
 
@@ -846,6 +1632,20 @@ async function internalHandleDecomposeTask(task: string): Promise<string> {
     0.1,
     config.maxTokens
   );
+  // The decomposer contract is JSON — strip any prose or fencing the
+  // model wrapped around the object; fall back to the raw text when no
+  // object is found.
+  const json = extractJson(text);
+  if (json) {
+    try {
+      // Parse once and re-emit normalized, so consumers always get
+      // valid JSON with stable formatting rather than whatever spacing
+      // the model produced.
+      return JSON.stringify(JSON.parse(json), null, 2);
+    } catch {
+      return json; // Extracted but malformed — pass through unchanged
+    }
+  }
   return text;
 }
 